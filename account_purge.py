@@ -0,0 +1,56 @@
+import logging
+
+from sqlalchemy import delete, select
+
+import models
+from database import AsyncSessionLocal
+from media_cleanup import cleanup_queue
+
+logger = logging.getLogger("uvicorn.error")
+
+
+async def purge_user(user_id: int, image_file: str | None, chunk_size: int) -> None:
+    """Delete a user's posts ``chunk_size`` rows per transaction, then the user.
+
+    Each chunk commits on its own, so the SQLite writer lock is released
+    between chunks and memory use doesn't grow with the number of posts.
+    """
+    async with AsyncSessionLocal() as db:
+        deleted = 0
+        while True:
+            chunk = (
+                select(models.Post.id)
+                .where(models.Post.user_id == user_id)
+                .limit(chunk_size)
+                .scalar_subquery()
+            )
+            result = await db.execute(delete(models.Post).where(models.Post.id.in_(chunk)))
+            await db.commit()
+            deleted += result.rowcount
+            if result.rowcount < chunk_size:
+                break
+
+        # Anything left (refresh tokens, posts created meanwhile) goes by ON DELETE CASCADE
+        await db.execute(delete(models.User).where(models.User.id == user_id))
+        await db.commit()
+
+    cleanup_queue.enqueue(image_file)
+    logger.info("Purged user %d and %d posts", user_id, deleted)
+
+
+async def resume_pending_purges(chunk_size: int) -> None:
+    """Finish purges that were accepted but interrupted (e.g. the worker died)."""
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(
+            select(models.User.id, models.User.image_file).where(
+                models.User.deleted_at.is_not(None),
+            ),
+        )
+        pending = result.all()
+
+    for user_id, image_file in pending:
+        # Chunks already deleted stay deleted, so this carries on where it stopped
+        try:
+            await purge_user(user_id, image_file, chunk_size)
+        except Exception:
+            logger.exception("Resuming purge of user %d failed", user_id)
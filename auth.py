@@ -1,29 +1,40 @@
+import hashlib
+import secrets
 from datetime import UTC, datetime, timedelta
+from functools import cache
 from jose import jwt
 from fastapi.security import OAuth2PasswordBearer
-from pwdlib import PasswordHash
 
 from config import settings
 
-from sqlalchemy import select
+from sqlalchemy import delete, select
 from sqlalchemy.ext.asyncio import AsyncSession
 import models
-from typing import Annotated
+from typing import TYPE_CHECKING, Annotated
 from fastapi import Depends, HTTPException, status
 from database import  get_db
 
+if TYPE_CHECKING:
+    from pwdlib import PasswordHash
 
-password_hash = PasswordHash.recommended()
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/users/token")
 
 
+@cache
+def get_password_hash() -> "PasswordHash":
+    """Build the Argon2 hasher on first use instead of at import time."""
+    from pwdlib import PasswordHash
+
+    return PasswordHash.recommended()
+
+
 def hash_password(password: str) -> str:
-    return password_hash.hash(password)
+    return get_password_hash().hash(password)
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return password_hash.verify(plain_password, hashed_password)
+    return get_password_hash().verify(plain_password, hashed_password)
 
 
 def create_access_token(data: dict, expires_delta: timedelta | None = None) -> str:
@@ -58,6 +69,44 @@ def verify_access_token(token: str) -> str | None:
     else:
         return payload.get("sub")
     
+def hash_refresh_token(token: str) -> str:
+    """Refresh tokens are random 256-bit strings, so a plain SHA-256 is enough."""
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def create_refresh_token(db: AsyncSession, user_id: int) -> str:
+    """Store a new opaque refresh token for the user (caller commits)."""
+    token = secrets.token_urlsafe(32)
+    db.add(
+        models.RefreshToken(
+            token_hash=hash_refresh_token(token),
+            user_id=user_id,
+            expires_at=datetime.now(UTC) + timedelta(days=settings.refresh_token_expire_days),
+        ),
+    )
+    return token
+
+
+async def consume_refresh_token(db: AsyncSession, token: str) -> int | None:
+    """Delete a valid refresh token and return its user id, so it can only be used once."""
+    result = await db.execute(
+        delete(models.RefreshToken)
+        .where(
+            models.RefreshToken.token_hash == hash_refresh_token(token),
+            models.RefreshToken.expires_at > datetime.now(UTC),
+        )
+        .returning(models.RefreshToken.user_id),
+    )
+    return result.scalars().first()
+
+
+async def revoke_refresh_tokens(db: AsyncSession, user_id: int, expired_only: bool = False) -> None:
+    statement = delete(models.RefreshToken).where(models.RefreshToken.user_id == user_id)
+    if expired_only:
+        statement = statement.where(models.RefreshToken.expires_at <= datetime.now(UTC))
+    await db.execute(statement)
+
+
 ## get_current_user
 async def get_current_user(
     token: Annotated[str, Depends(oauth2_scheme)],
@@ -83,7 +132,10 @@ async def get_current_user(
         )
 
     result = await db.execute(
-        select(models.User).where(models.User.id == user_id_int),
+        select(models.User).where(
+            models.User.id == user_id_int,
+            models.User.deleted_at.is_(None),
+        ),
     )
     user = result.scalars().first()
     if not user:
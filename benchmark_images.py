@@ -0,0 +1,80 @@
+"""Peak memory and latency of process_profile_image vs. a full-resolution decode.
+
+    python benchmark_images.py --megapixels 40
+
+Each run happens in a fresh subprocess so ru_maxrss is that run's peak.
+"""
+import argparse
+import json
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from io import BytesIO
+from pathlib import Path
+
+import image_utils
+
+
+def full_decode(content: bytes) -> None:
+    """The previous implementation: decode everything, then fit."""
+    from PIL import Image, ImageOps
+
+    with Image.open(BytesIO(content)) as original:
+        img = ImageOps.exif_transpose(original)
+        img = ImageOps.fit(img, (300, 300), method=Image.Resampling.LANCZOS)
+        if img.mode in ("RGBA", "LA", "P"):
+            img = img.convert("RGB")
+        img.save(BytesIO(), "JPEG", quality=85, optimize=True)
+
+
+def make_image(path: Path, megapixels: float, fmt: str) -> None:
+    from PIL import Image
+
+    width = int((megapixels * 1_000_000 * 4 / 3) ** 0.5)
+    height = width * 3 // 4
+    noise = Image.effect_noise((width // 8, height // 8), 64).convert("RGB")
+    noise.resize((width, height)).save(path, fmt)
+
+
+def run_one(variant: str, path: str) -> None:
+    content = Path(path).read_bytes()
+    baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    started = time.perf_counter()
+    if variant == "full decode":
+        full_decode(content)
+    else:
+        image_utils.PROFILE_PICS_DIR = Path(tempfile.mkdtemp())
+        image_utils.process_profile_image(content)
+    elapsed = time.perf_counter() - started
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(json.dumps({"seconds": elapsed, "peak_kb": peak - baseline}))
+
+
+def main(megapixels: float) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        for fmt in ("JPEG", "PNG"):
+            path = Path(tmp) / f"upload.{fmt.lower()}"
+            make_image(path, megapixels, fmt)
+            for variant in ("full decode", "draft + reduce"):
+                output = subprocess.run(
+                    [sys.executable, __file__, "--run", variant, str(path)],
+                    capture_output=True, text=True, check=True,
+                ).stdout
+                result = json.loads(output)
+                print(
+                    f"{fmt:>4} {megapixels:g} MP {variant:>15}: "
+                    f"{result['seconds'] * 1000:7.0f} ms, +{result['peak_kb'] / 1024:6.0f} MB peak RSS",
+                )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--megapixels", type=float, default=40)
+    parser.add_argument("--run", nargs=2, metavar=("VARIANT", "PATH"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.run:
+        run_one(*args.run)
+    else:
+        main(args.megapixels)
@@ -0,0 +1,82 @@
+"""Compare per-request commits with WriteBatcher on a scratch SQLite file.
+
+    python benchmark_writes.py --posts 2000 --concurrency 100
+"""
+import argparse
+import asyncio
+import tempfile
+import time
+from pathlib import Path
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+import models
+from database import Base
+from rendering import render_post_content
+from routers.posts import write_new_post
+from schemas import PostCreate
+from write_batching import WriteBatcher
+
+
+def rendered(post: PostCreate) -> dict:
+    content_html, excerpt = render_post_content(post.content)
+    return {"content_html": content_html, "excerpt": excerpt}
+
+
+async def per_request(sessions, posts: list[PostCreate], user_id: int, concurrency: int) -> None:
+    limit = asyncio.Semaphore(concurrency)
+
+    async def one(post: PostCreate) -> None:
+        async with limit, sessions() as db:
+            await write_new_post(db, post, user_id, rendered(post))
+            await db.commit()
+
+    await asyncio.gather(*(one(post) for post in posts))
+
+
+async def batched(sessions, posts: list[PostCreate], user_id: int, concurrency: int, window_ms: float) -> None:
+    batcher = WriteBatcher(window_ms=window_ms, max_batch=concurrency, session_factory=sessions)
+    batcher.start()
+    limit = asyncio.Semaphore(concurrency)
+
+    async def one(post: PostCreate) -> None:
+        async with limit:
+            fields = rendered(post)
+            await batcher.submit(lambda db: write_new_post(db, post, user_id, fields))
+
+    await asyncio.gather(*(one(post) for post in posts))
+    await batcher.stop()
+
+
+async def main(n_posts: int, concurrency: int, window_ms: float) -> None:
+    posts = [PostCreate(title=f"Post {i}", content=f"Benchmark *post* {i}") for i in range(n_posts)]
+
+    for name in ("per-request commit", "group commit"):
+        with tempfile.TemporaryDirectory() as tmp:
+            engine = create_async_engine(f"sqlite+aiosqlite:///{Path(tmp) / 'bench.db'}")
+            sessions = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+            async with engine.begin() as conn:
+                await conn.run_sync(Base.metadata.create_all)
+            async with sessions() as db:
+                user = models.User(username="bench", email="bench@example.com", password_hash="x")
+                db.add(user)
+                await db.commit()
+
+            started = time.perf_counter()
+            if name == "group commit":
+                await batched(sessions, posts, user.id, concurrency, window_ms)
+            else:
+                await per_request(sessions, posts, user.id, concurrency)
+            elapsed = time.perf_counter() - started
+            await engine.dispose()
+
+        print(f"{name:>20}: {n_posts} posts in {elapsed:.2f}s ({n_posts / elapsed:,.0f} writes/s)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--posts", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--window-ms", type=float, default=5)
+    args = parser.parse_args()
+    asyncio.run(main(args.posts, args.concurrency, args.window_ms))
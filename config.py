@@ -8,10 +8,62 @@ class Settings(BaseSettings):
         env_file_encoding="utf-8",
     )
 
+    database_url: str = "sqlite+aiosqlite:///./blog.db"
+
     secret_key: SecretStr
     algorithm: str = "HS256"
     access_token_expire_minutes: int = 30
+    refresh_token_expire_days: int = 30
 
     max_upload_size_bytes: int = 5*1024*1024
+    # Largest upload accepted, by the image's stored width x height; also
+    # sets Pillow's Image.MAX_IMAGE_PIXELS so both limits agree
+    max_image_pixels: int = 50_000_000
+
+    # Templates: compiled bytecode is cached on disk so new workers skip
+    # recompiling layout.html; turn auto reload on only while editing templates.
+    templates_dir: str = "templates"
+    template_cache_dir: str = ".jinja_cache"
+    templates_auto_reload: bool = False
+
+    # Response compression
+    compression_enabled: bool = True
+    compression_minimum_size: int = 500
+    gzip_level: int = 6
+    brotli_quality: int = 4
+    zstd_level: int = 3
+
+    # Opt-in SQL instrumentation: slow-query log with SQLite query plans and
+    # a warning when one request repeats a statement (likely N+1)
+    db_instrumentation_enabled: bool = False
+    slow_query_ms: float = 100
+    n_plus_one_threshold: int = 5
+
+    # Orphaned profile pictures: periodic sweep (0 disables it) and the age a
+    # file must reach before it counts, so in-flight uploads are never removed
+    media_sweep_interval_seconds: int = 0
+    media_sweep_batch_size: int = 500
+    media_orphan_min_age_seconds: int = 3600
+
+    # Accounts with more posts than this are deleted in background chunks
+    account_purge_chunk_size: int = 500
+
+    # Group commit for post writes: requests arriving within the window share
+    # one transaction (one fsync) instead of committing one by one
+    write_batching_enabled: bool = False
+    write_batch_window_ms: float = 5
+    write_batch_max_size: int = 50
+
+    # On-demand profiling (needs pyinstrument). Requests sending
+    # X-Profile-Token: <profiling_token>, or picked by the sample rate, are
+    # profiled; the same header unlocks /api/profiles
+    profiling_enabled: bool = False
+    profiling_token: SecretStr | None = None
+    profiling_sample_rate: float = 0.0
+    profiling_dir: str = "profiles"
+    profiling_max_files: int = 50
+
+    # Open the DB pool and compile every template before serving traffic
+    startup_warmup: bool = False
 
 settings = Settings()  # Loaded from .env file
\ No newline at end of file
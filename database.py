@@ -1,13 +1,24 @@
+from sqlalchemy import Connection, event
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import DeclarativeBase, sessionmaker
 
-SQLALCHEMY_DATABASE_URL = "sqlite+aiosqlite:///./blog.db"
+from config import settings
+
+SQLALCHEMY_DATABASE_URL = settings.database_url
 
 engine = create_async_engine(
     SQLALCHEMY_DATABASE_URL,
     connect_args={"check_same_thread": False},
 )
 
+
+# SQLite ignores foreign keys (and ON DELETE CASCADE) unless asked per connection
+@event.listens_for(engine.sync_engine, "connect")
+def _enable_sqlite_foreign_keys(dbapi_connection, _connection_record):
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA foreign_keys=ON")
+    cursor.close()
+
 AsyncSessionLocal = async_sessionmaker(
     engine,
     class_=AsyncSession,
@@ -21,4 +32,80 @@ class Base(DeclarativeBase):
 
 async def get_db():
     async with AsyncSessionLocal() as session:
-        yield session
\ No newline at end of file
+        yield session
+
+
+## Schema upgrades
+def upgrade_schema(conn: Connection) -> None:
+    """Bring tables made by older versions in line with the models.
+
+    create_all() never alters existing tables: missing nullable columns are
+    added, and since SQLite can't change a foreign key in place, tables
+    whose ON DELETE rules differ from the models are rebuilt and their rows
+    copied over. Only tables no other table references can be rebuilt.
+    """
+    for table in Base.metadata.sorted_tables:
+        _add_missing_columns(conn, table)
+
+        existing = {
+            row[3]: row[6]  # from column -> on_delete
+            for row in conn.exec_driver_sql(f"PRAGMA foreign_key_list({table.name})")
+        }
+        if not existing:
+            continue
+        if all(
+            existing.get(fk.parent.name, "NO ACTION") == (fk.ondelete or "NO ACTION").upper()
+            for fk in table.foreign_keys
+        ):
+            continue
+        _rebuild_table(conn, table)
+
+
+def _add_missing_columns(conn: Connection, table) -> None:
+    old_columns = {row[1] for row in conn.exec_driver_sql(f"PRAGMA table_info({table.name})")}
+    for column in table.columns:
+        if column.name not in old_columns and column.nullable:
+            column_type = column.type.compile(dialect=conn.dialect)
+            conn.exec_driver_sql(
+                f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}",
+            )
+
+
+def _referencing_tables(conn: Connection, table_name: str) -> list[str]:
+    names = conn.exec_driver_sql(
+        "SELECT name FROM sqlite_master WHERE type = 'table' AND name != ?", (table_name,),
+    ).scalars()
+    return [
+        name
+        for name in names
+        if any(
+            row[2] == table_name
+            for row in conn.exec_driver_sql(f'PRAGMA foreign_key_list("{name}")')
+        )
+    ]
+
+
+def _rebuild_table(conn: Connection, table) -> None:
+    # With foreign keys on (and they can't be turned off inside this
+    # transaction), renaming a parent table repoints its children at the old
+    # name, and dropping that then cascade-deletes their rows
+    children = _referencing_tables(conn, table.name)
+    if children:
+        raise RuntimeError(
+            f"Can't rebuild {table.name} automatically: {', '.join(children)} "
+            "reference it. Migrate it by hand with PRAGMA foreign_keys=OFF.",
+        )
+
+    old_name = f"_old_{table.name}"
+    old_columns = {row[1] for row in conn.exec_driver_sql(f"PRAGMA table_info({table.name})")}
+    columns = ", ".join(c.name for c in table.columns if c.name in old_columns)
+
+    # Index names are global in SQLite, so free them for the new table
+    for index in table.indexes:
+        conn.exec_driver_sql(f"DROP INDEX IF EXISTS {index.name}")
+    conn.exec_driver_sql(f"ALTER TABLE {table.name} RENAME TO {old_name}")
+    table.create(conn)
+    conn.exec_driver_sql(
+        f"INSERT INTO {table.name} ({columns}) SELECT {columns} FROM {old_name}",
+    )
+    conn.exec_driver_sql(f"DROP TABLE {old_name}")
@@ -0,0 +1,132 @@
+import logging
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+logger = logging.getLogger("uvicorn.error")
+
+
+@dataclass
+class QueryStats:
+    """Statements seen while a request (or a test block) was running."""
+
+    statements: Counter = field(default_factory=Counter)
+    total_seconds: float = 0.0
+
+    @property
+    def count(self) -> int:
+        return sum(self.statements.values())
+
+    def repeated(self, threshold: int) -> list[tuple[str, int]]:
+        return [(sql, n) for sql, n in self.statements.most_common() if n >= threshold]
+
+
+# Stats follow the context: a request only counts its own statements, and
+# TestClient copies the test's context into the requests it makes, while
+# tasks started earlier (e.g. in the app lifespan) are left out.
+_request_stats: ContextVar[tuple[QueryStats, ...]] = ContextVar("request_query_stats", default=())
+
+_slow_query_seconds: float | None = None
+
+
+## Engine listeners
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_start"].pop()
+
+    # Bound parameters are placeholders, so the SQL text is the statement shape
+    for stats in _request_stats.get():
+        stats.statements[statement] += 1
+        stats.total_seconds += elapsed
+
+    if _slow_query_seconds is not None and elapsed >= _slow_query_seconds:
+        logger.warning(
+            "Slow query (%.1f ms): %s\n%s",
+            elapsed * 1000,
+            statement,
+            _explain(conn, statement, parameters),
+        )
+
+
+def _explain(conn, statement, parameters) -> str:
+    if conn.dialect.name != "sqlite" or not statement.lstrip().upper().startswith("SELECT"):
+        return ""
+    try:
+        # A separate cursor so the original result set is left alone
+        plan_cursor = conn.connection.cursor()
+        plan_cursor.execute(f"EXPLAIN QUERY PLAN {statement}", parameters)
+        rows = plan_cursor.fetchall()
+        plan_cursor.close()
+    except Exception as err:  # noqa: BLE001 - logging must never break the query
+        return f"  (no query plan: {err})"
+    return "\n".join(f"  {row[-1]}" for row in rows)
+
+
+def _handle_error(exception_context):
+    # A failed statement never reaches after_cursor_execute; drop its start
+    # time so it doesn't stay on the pooled connection
+    conn = exception_context.connection
+    if conn is not None and conn.info.get("query_start"):
+        conn.info["query_start"].pop()
+
+
+def install_query_listeners(engine: AsyncEngine, slow_query_ms: float | None = None) -> None:
+    """Attach the timing listeners to ``engine``; safe to call more than once."""
+    global _slow_query_seconds
+    if slow_query_ms is not None:
+        _slow_query_seconds = slow_query_ms / 1000
+
+    sync_engine = engine.sync_engine
+    if not event.contains(sync_engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+        event.listen(sync_engine, "handle_error", _handle_error)
+
+
+@contextmanager
+def track_request_queries():
+    """Count statements run from the current context (one request or test) in the block."""
+    stats = QueryStats()
+    # Nested trackers (e.g. profiling inside N+1 detection) all see the queries
+    token = _request_stats.set((*_request_stats.get(), stats))
+    try:
+        yield stats
+    finally:
+        _request_stats.reset(token)
+
+
+## N+1 detection middleware
+class QueryTrackingMiddleware:
+    """Warn when one request runs the same statement shape ``n_plus_one_threshold`` times."""
+
+    def __init__(self, app: ASGIApp, n_plus_one_threshold: int = 5) -> None:
+        self.app = app
+        self.n_plus_one_threshold = n_plus_one_threshold
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        with track_request_queries() as stats:
+            await self.app(scope, receive, send)
+
+        for statement, times in stats.repeated(self.n_plus_one_threshold):
+            logger.warning(
+                "Possible N+1 on %s %s: statement ran %d times (%d queries, %.1f ms total): %s",
+                scope["method"],
+                scope["path"],
+                times,
+                stats.count,
+                stats.total_seconds * 1000,
+                statement,
+            )
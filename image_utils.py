@@ -2,20 +2,53 @@ import uuid
 from io import BytesIO
 from pathlib import Path
 
-from PIL import Image, ImageOps
-
 PROFILE_PICS_DIR = Path('media/profile_pics')
 
+PROFILE_SIZE = 300
+
+
+class ImageTooLargeError(ValueError):
+    """The image would decode to more pixels than allowed."""
+
+
 ## Process Image Function
-def process_profile_image(content: bytes) -> str:
-    with Image.open(BytesIO(content)) as original:
-        img = ImageOps.exif_transpose(original)
+def process_profile_image(content: bytes, max_pixels: int | None = None) -> str:
+    # Pillow is only needed for uploads, so keep it out of worker boot
+    from PIL import Image, ImageOps
+
+    # Keep Pillow's own decompression-bomb cap in line with ours
+    if max_pixels is not None:
+        Image.MAX_IMAGE_PIXELS = max_pixels
 
-        img = ImageOps.fit(img, (300, 300), method=Image.Resampling.LANCZOS)
+    try:
+        original = Image.open(BytesIO(content))
+    except Image.DecompressionBombError as err:
+        raise ImageTooLargeError(str(err)) from err
 
-        if img.mode in ("RGBA", "LA", "P"):
+    with original:
+        # Only the header has been read so far, so checking the real
+        # dimensions here is cheap
+        width, height = original.size
+        if max_pixels is not None and width * height > max_pixels:
+            raise ImageTooLargeError(f"{width}x{height} exceeds {max_pixels} pixels")
+
+        # JPEGs can decode at 1/2, 1/4 or 1/8 scale; this picks the smallest
+        # scale that still leaves both sides at least PROFILE_SIZE
+        original.draft("RGB", (PROFILE_SIZE, PROFILE_SIZE))
+
+        img = ImageOps.exif_transpose(original)
+
+        # reduce() can't handle modes like "1" or "P", and JPEG wants RGB or L anyway
+        if img.mode not in ("RGB", "L"):
             img = img.convert("RGB")
 
+        # Cheap box reduction down to about twice the target, then LANCZOS
+        factor = min(img.size) // (PROFILE_SIZE * 2)
+        if factor > 1:
+            img = img.reduce(factor)
+
+        img = ImageOps.fit(img, (PROFILE_SIZE, PROFILE_SIZE), method=Image.Resampling.LANCZOS)
+
         filename = f"{uuid.uuid4().hex}.jpg"
         filepath = PROFILE_PICS_DIR / filename
 
@@ -31,5 +64,4 @@ def delete_profile_image(filename: str | None) -> None:
         return
 
     filepath = PROFILE_PICS_DIR / filename
-    if filepath.exists():
-        filepath.unlink()
\ No newline at end of file
+    filepath.unlink(missing_ok=True)
\ No newline at end of file
@@ -1,6 +1,15 @@
+import time
+
+_import_started = time.perf_counter()
+
+import asyncio
+import logging
 from contextlib import asynccontextmanager
+from pathlib import Path
 from typing import Annotated
 
+import jinja2
+
 from fastapi import Depends, FastAPI, HTTPException, Request, status
 from fastapi.exception_handlers import (
     http_exception_handler,
@@ -9,38 +18,115 @@ from fastapi.exception_handlers import (
 from fastapi.exceptions import RequestValidationError
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
-from sqlalchemy import select
+from sqlalchemy import select, text
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 from starlette.exceptions import HTTPException as StarletteHTTPException
 
 import models
-from database import Base, engine, get_db
+from config import settings
+from database import Base, engine, get_db, upgrade_schema
+from account_purge import resume_pending_purges
+from db_instrumentation import QueryTrackingMiddleware, install_query_listeners
+from media_cleanup import cleanup_queue, run_sweeper
+from profiling import ProfilingMiddleware
+from write_batching import post_writes
+from middleware import CompressionMiddleware
+
+from routers import posts, profiles, users
+
+logger = logging.getLogger("uvicorn.error")
 
-from routers import posts, users
+IMPORT_SECONDS = time.perf_counter() - _import_started
 
 
+## Startup warm-up
+async def warm_up() -> None:
+    # Check out a pooled connection so the first request doesn't pay for it
+    async with engine.connect() as conn:
+        await conn.execute(text("SELECT 1"))
+
+    # Compiling here also fills the bytecode cache for the next worker
+    for name in templates.env.list_templates(extensions=["html"]):
+        templates.get_template(name)
+
 
 @asynccontextmanager
 async def lifespan(_app: FastAPI):
     # Startup
+    startup_started = time.perf_counter()
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(upgrade_schema)
+    if settings.startup_warmup:
+        await warm_up()
+    logger.info(
+        "Imports took %.3fs, startup took %.3fs (warm-up %s)",
+        IMPORT_SECONDS,
+        time.perf_counter() - startup_started,
+        "on" if settings.startup_warmup else "off",
+    )
+
+    cleanup_queue.start()
+    if settings.write_batching_enabled:
+        post_writes.start()
+    purges = asyncio.create_task(resume_pending_purges(settings.account_purge_chunk_size))
+    sweeper = None
+    if settings.media_sweep_interval_seconds > 0:
+        sweeper = asyncio.create_task(run_sweeper(settings.media_sweep_interval_seconds))
     yield
     # Shutdown
+    purges.cancel()
+    if sweeper is not None:
+        sweeper.cancel()
+    await post_writes.stop()
+    await cleanup_queue.stop()
     await engine.dispose()
 
 app = FastAPI(lifespan=lifespan)
 
+if settings.profiling_enabled:
+    # Profiles report each request's time in the DB, which the listeners
+    # measure; without slow_query_ms this leaves slow-query logging off
+    install_query_listeners(engine)
+    app.add_middleware(ProfilingMiddleware, sample_rate=settings.profiling_sample_rate)
+
+if settings.db_instrumentation_enabled:
+    install_query_listeners(engine, slow_query_ms=settings.slow_query_ms)
+    app.add_middleware(
+        QueryTrackingMiddleware,
+        n_plus_one_threshold=settings.n_plus_one_threshold,
+    )
+
+if settings.compression_enabled:
+    app.add_middleware(
+        CompressionMiddleware,
+        minimum_size=settings.compression_minimum_size,
+        gzip_level=settings.gzip_level,
+        brotli_quality=settings.brotli_quality,
+        zstd_level=settings.zstd_level,
+    )
+
 app.mount("/static", StaticFiles(directory="static"), name="static")
 
 app.mount("/media", StaticFiles(directory="media"), name="media")
 
-templates = Jinja2Templates(directory="templates")
+## templates
+Path(settings.template_cache_dir).mkdir(parents=True, exist_ok=True)
+templates = Jinja2Templates(
+    env=jinja2.Environment(
+        loader=jinja2.FileSystemLoader(settings.templates_dir),
+        autoescape=True,
+        auto_reload=settings.templates_auto_reload,
+        bytecode_cache=jinja2.FileSystemBytecodeCache(settings.template_cache_dir),
+    ),
+)
 
 # Creating a prefix path to users, posts routes
 app.include_router(users.router, prefix="/api/users", tags=["users"])
 app.include_router(posts.router, prefix="/api/posts", tags=['posts'])
+if settings.profiling_enabled:
+    app.include_router(profiles.router, prefix="/api/profiles", tags=["profiles"])
 
 ## home route
 @app.get("/", include_in_schema=False, name="home")
@@ -49,6 +135,9 @@ async def home(request: Request, db: Annotated[AsyncSession, Depends(get_db)]):
     result = await db.execute(
         select(models.Post)
         .options(selectinload(models.Post.author)) # egar loading options(selectinload(models.Post.author)
+        # Accounts being purged are hidden already
+        .join(models.Post.author)
+        .where(models.User.deleted_at.is_(None))
         .order_by(models.Post.date_posted.desc()) 
     )
     posts = result.scalars().all()
@@ -65,7 +154,8 @@ async def post_page(request: Request, post_id: int, db: Annotated[AsyncSession,
     result = await db.execute(
         select(models.Post)
         .options(selectinload(models.Post.author)) # egar loading options(selectinload(models.Post.author)
-        .where(models.Post.id == post_id))
+        .join(models.Post.author)
+        .where(models.Post.id == post_id, models.User.deleted_at.is_(None)))
     post = result.scalars().first()
     if post:
         title = post.title[:50]
@@ -83,7 +173,9 @@ async def user_posts_page(
     user_id: int,
     db: Annotated[AsyncSession, Depends(get_db)],
 ):
-    result = await db.execute(select(models.User).where(models.User.id == user_id))
+    result = await db.execute(
+        select(models.User).where(models.User.id == user_id, models.User.deleted_at.is_(None)),
+    )
     user = result.scalars().first()
     if not user:
         raise HTTPException(
@@ -0,0 +1,143 @@
+"""Background deletion of profile pictures and an orphan sweeper.
+
+Run the sweeper by hand with::
+
+    python media_cleanup.py --batch-size 500 --min-age 3600
+"""
+import argparse
+import asyncio
+import logging
+import os
+import time
+from collections.abc import Iterator
+
+from sqlalchemy import select
+
+import models
+from config import settings
+from database import AsyncSessionLocal
+from image_utils import PROFILE_PICS_DIR, delete_profile_image
+
+logger = logging.getLogger("uvicorn.error")
+
+
+## Deletion queue
+class MediaCleanupQueue:
+    """Deletes files on a worker task so request handlers never touch the disk.
+
+    Anything still queued when the process dies is picked up by sweep_orphans.
+    """
+
+    def __init__(self) -> None:
+        # Made in start(): a queue belongs to the event loop that first uses it,
+        # and each app lifespan (e.g. each TestClient) may run on a new loop
+        self._queue: asyncio.Queue[str] | None = None
+        self._worker: asyncio.Task | None = None
+
+    def enqueue(self, filename: str | None) -> None:
+        if filename is None:
+            return
+        if self._queue is None:
+            logger.warning("Cleanup queue not running; leaving %s to the orphan sweep", filename)
+            return
+        self._queue.put_nowait(filename)
+
+    def start(self) -> None:
+        if self._worker is None:
+            self._queue = asyncio.Queue()
+            self._worker = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Finish pending deletions, then stop the worker."""
+        if self._worker is None:
+            return
+        await self._queue.join()
+        self._worker.cancel()
+        self._worker = None
+        self._queue = None
+
+    async def _run(self) -> None:
+        while True:
+            filename = await self._queue.get()
+            try:
+                await asyncio.to_thread(delete_profile_image, filename)
+            except Exception:
+                # Keep the worker alive, or stop() would wait on join() forever
+                logger.exception("Could not delete profile picture %s", filename)
+            finally:
+                self._queue.task_done()
+
+
+cleanup_queue = MediaCleanupQueue()
+
+
+## Orphan sweeper
+def _iter_candidate_batches(batch_size: int, min_age_seconds: float) -> Iterator[list[str]]:
+    # Young files may belong to an upload that hasn't committed yet
+    cutoff = time.time() - min_age_seconds
+    batch = []
+    with os.scandir(PROFILE_PICS_DIR) as entries:
+        for entry in entries:
+            if entry.is_file() and entry.stat().st_mtime < cutoff:
+                batch.append(entry.name)
+                if len(batch) >= batch_size:
+                    yield batch
+                    batch = []
+    if batch:
+        yield batch
+
+
+def _delete_files(filenames: list[str]) -> None:
+    for filename in filenames:
+        delete_profile_image(filename)
+
+
+async def sweep_orphans(batch_size: int = 500, min_age_seconds: float = 3600) -> int:
+    """Delete files in media/profile_pics that no user references; returns the count."""
+    if not PROFILE_PICS_DIR.exists():
+        return 0
+
+    deleted = 0
+    batches = _iter_candidate_batches(batch_size, min_age_seconds)
+    async with AsyncSessionLocal() as db:
+        # Pull one batch at a time off the directory listing in a worker thread
+        while batch := await asyncio.to_thread(next, batches, None):
+            result = await db.execute(
+                select(models.User.image_file).where(models.User.image_file.in_(batch)),
+            )
+            referenced = set(result.scalars().all())
+            orphans = [name for name in batch if name not in referenced]
+            if orphans:
+                await asyncio.to_thread(_delete_files, orphans)
+                deleted += len(orphans)
+
+    if deleted:
+        logger.info("Deleted %d orphaned profile pictures", deleted)
+    return deleted
+
+
+async def run_sweeper(interval_seconds: float) -> None:
+    """Sweep forever every ``interval_seconds``; started from main.lifespan."""
+    while True:
+        await asyncio.sleep(interval_seconds)
+        try:
+            await sweep_orphans(
+                batch_size=settings.media_sweep_batch_size,
+                min_age_seconds=settings.media_orphan_min_age_seconds,
+            )
+        except Exception:
+            logger.exception("Orphaned media sweep failed")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Delete orphaned profile pictures.")
+    parser.add_argument("--batch-size", type=int, default=settings.media_sweep_batch_size)
+    parser.add_argument(
+        "--min-age",
+        type=float,
+        default=settings.media_orphan_min_age_seconds,
+        help="only delete files older than this many seconds",
+    )
+    args = parser.parse_args()
+    count = asyncio.run(sweep_orphans(args.batch_size, args.min_age))
+    print(f"Deleted {count} orphaned files")
@@ -0,0 +1,233 @@
+import zlib
+
+import brotli
+import zstandard
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# Server preference order when the client accepts several equally
+ENCODINGS = ["br", "zstd", "gzip"]
+
+
+COMPRESSIBLE_TYPES = (
+    "text/html",
+    "text/css",
+    "text/plain",
+    "text/javascript",
+    "application/javascript",
+    "application/json",
+    "application/manifest+json",
+    "image/svg+xml",
+)
+
+# Responses that must keep their body (or byte ranges) untouched
+SKIP_STATUS_CODES = {204, 206, 304}
+
+
+## Streaming compressors
+class GzipCompressor:
+    def __init__(self, level: int) -> None:
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush()
+
+
+class BrotliCompressor:
+    def __init__(self, level: int) -> None:
+        self._compressor = brotli.Compressor(quality=level)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.process(data) + self._compressor.flush()
+
+    def finish(self) -> bytes:
+        return self._compressor.finish()
+
+
+class ZstdCompressor:
+    def __init__(self, level: int) -> None:
+        self._compressor = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data) + self._compressor.flush(
+            zstandard.COMPRESSOBJ_FLUSH_BLOCK,
+        )
+
+    def finish(self) -> bytes:
+        return self._compressor.flush()
+
+
+def parse_accept_encoding(value: str) -> dict[str, float]:
+    accepted = {}
+    for item in value.split(","):
+        coding, _, params = item.strip().partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        for param in params.split(";"):
+            name, _, raw = param.strip().partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    q = float(raw)
+                except ValueError:
+                    q = 0.0
+        accepted[coding] = q
+    return accepted
+
+
+def choose_encoding(accept_encoding: str, encodings: list[str]) -> str | None:
+    accepted = parse_accept_encoding(accept_encoding)
+    wildcard = accepted.get("*", 0.0)
+    best, best_q = None, 0.0
+    for encoding in encodings:
+        q = accepted.get(encoding, wildcard)
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+## Compression Middleware
+class CompressionMiddleware:
+    """Negotiate br/zstd/gzip for text-like responses above a size threshold.
+
+    Single-body responses below ``minimum_size`` go out untouched; streamed
+    responses are compressed chunk by chunk and flushed as they arrive.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = 500,
+        gzip_level: int = 6,
+        brotli_quality: int = 4,
+        zstd_level: int = 3,
+        content_types: tuple[str, ...] = COMPRESSIBLE_TYPES,
+    ) -> None:
+        self.app = app
+        self.minimum_size = minimum_size
+        self.content_types = content_types
+        self.encodings = ENCODINGS
+        self.levels = {"br": brotli_quality, "zstd": zstd_level, "gzip": gzip_level}
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        accept_encoding = Headers(scope=scope).get("accept-encoding", "")
+        encoding = choose_encoding(accept_encoding, self.encodings)
+        responder = CompressionResponder(self, send, encoding, head_only=scope["method"] == "HEAD")
+        await self.app(scope, receive, responder.send)
+
+    def new_compressor(self, encoding: str):
+        level = self.levels[encoding]
+        if encoding == "br":
+            return BrotliCompressor(level)
+        if encoding == "zstd":
+            return ZstdCompressor(level)
+        return GzipCompressor(level)
+
+    def is_compressible(self, headers: MutableHeaders) -> bool:
+        content_type = headers.get("content-type", "").split(";")[0].strip().lower()
+        return content_type in self.content_types
+
+
+class CompressionResponder:
+    def __init__(
+        self,
+        middleware: CompressionMiddleware,
+        send: Send,
+        encoding: str | None,
+        head_only: bool = False,
+    ) -> None:
+        self.middleware = middleware
+        self._send = send
+        self.encoding = encoding
+        self.head_only = head_only
+        self.start_message: Message | None = None
+        self.compressor = None
+        self.passthrough = False
+
+    async def send(self, message: Message) -> None:
+        if self.passthrough:
+            await self._send(message)
+            return
+
+        if message["type"] == "http.response.start":
+            headers = MutableHeaders(raw=message["headers"])
+            if (
+                message["status"] in SKIP_STATUS_CODES
+                or "content-encoding" in headers
+                or not self.middleware.is_compressible(headers)
+            ):
+                self.passthrough = True
+                await self._send(message)
+                return
+
+            # The body depends on Accept-Encoding even when we send it as is
+            headers.add_vary_header("Accept-Encoding")
+            if self.encoding is None:
+                self.passthrough = True
+                await self._send(message)
+                return
+
+            # Wait for the first body chunk to decide on compression
+            self.start_message = message
+            return
+
+        if message["type"] != "http.response.body":
+            # http.response.debug comes before the start message; after it,
+            # e.g. http.response.pathsend means the server writes the file itself
+            if self.start_message is not None and self.compressor is None:
+                self.passthrough = True
+                await self._send(self.start_message)
+            await self._send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self.compressor is None:
+            headers = MutableHeaders(raw=self.start_message["headers"])
+            size = len(body)
+            if self.head_only:
+                # A HEAD body is empty (FileResponse) or dropped by the server,
+                # so go by the length GET would send to give the same headers
+                size = int(headers.get("content-length", size))
+            if not more_body and size < self.middleware.minimum_size:
+                self.passthrough = True
+                await self._send(self.start_message)
+                await self._send(message)
+                return
+
+            self.compressor = self.middleware.new_compressor(self.encoding)
+            headers["Content-Encoding"] = self.encoding
+            # The compressed bytes differ from the identity representation
+            etag = headers.get("etag")
+            if etag and not etag.startswith("W/"):
+                headers["ETag"] = f"W/{etag}"
+            if self.head_only:
+                # The compressed length isn't known without a body to compress
+                del headers["Content-Length"]
+                body = b""
+            elif more_body:
+                del headers["Content-Length"]
+                body = self.compressor.compress(body)
+            else:
+                body = self.compressor.compress(body) + self.compressor.finish()
+                headers["Content-Length"] = str(len(body))
+            await self._send(self.start_message)
+            await self._send({"type": "http.response.body", "body": body, "more_body": more_body})
+            return
+
+        if self.head_only:
+            body = b""
+        else:
+            body = self.compressor.compress(body)
+            if not more_body:
+                body += self.compressor.finish()
+        await self._send({"type": "http.response.body", "body": body, "more_body": more_body})
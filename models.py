@@ -20,10 +20,18 @@ class User(Base):
         default=None,
     )
     password_hash: Mapped[str | None] = mapped_column(String(200), nullable=False)
+    # Set when a deletion is accepted; the row stays until account_purge finishes
+    deleted_at: Mapped[datetime | None] = mapped_column(
+        DateTime(timezone=True),
+        nullable=True,
+        default=None,
+    )
 
+    # Rows are removed by ON DELETE CASCADE, so deleting a user never loads its posts
     posts: Mapped[list[Post]] = relationship(
         back_populates="author", 
-        cascade="all , delete-orphan")
+        cascade="all , delete-orphan",
+        passive_deletes=True)
 
     @property
     def image_path(self) -> str:
@@ -38,8 +46,11 @@ class Post(Base):
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
     title: Mapped[str] = mapped_column(String(100), nullable=False)
     content: Mapped[str] = mapped_column(Text, nullable=False)
+    # Rendered from content on write (see rendering.py); NULL until backfilled
+    content_html: Mapped[str | None] = mapped_column(Text, nullable=True, default=None)
+    excerpt: Mapped[str | None] = mapped_column(String(300), nullable=True, default=None)
     user_id: Mapped[int] = mapped_column(
-        ForeignKey("users.id"),
+        ForeignKey("users.id", ondelete="CASCADE"),
         nullable=False,
         index=True,
     )
@@ -49,3 +60,21 @@ class Post(Base):
     )
 
     author: Mapped[User] = relationship(back_populates="posts")
+
+
+class RefreshToken(Base):
+    __tablename__ = "refresh_tokens"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
+    # Only the SHA-256 of the opaque token is stored
+    token_hash: Mapped[str] = mapped_column(String(64), unique=True, nullable=False)
+    user_id: Mapped[int] = mapped_column(
+        ForeignKey("users.id", ondelete="CASCADE"),
+        nullable=False,
+        index=True,
+    )
+    expires_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        default=lambda: datetime.now(UTC),
+    )
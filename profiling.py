@@ -0,0 +1,141 @@
+"""On-demand request profiling with pyinstrument.
+
+pyinstrument is an optional extra: install it with ``uv sync --extra
+profiling`` (or ``pip install pyinstrument``) where profiling is wanted.
+
+A request is profiled when it carries ``X-Profile-Token: <profiling_token>``,
+or when it is picked by ``profiling_sample_rate``; the same header unlocks
+the /api/profiles routes. The token is only read from the header, never the
+query string, so it stays out of access logs, browser history and Referer
+headers. Profiles are saved as speedscope JSON, which
+https://www.speedscope.app shows as a flamegraph, under ``profiling_dir``;
+only the newest ``profiling_max_files`` are kept.
+"""
+import asyncio
+import logging
+import os
+import random
+import re
+import secrets
+import threading
+import time
+import uuid
+from pathlib import Path
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from config import settings
+from db_instrumentation import track_request_queries
+
+logger = logging.getLogger("uvicorn.error")
+
+PROFILE_SUFFIX = ".speedscope.json"
+
+PROFILES_DIR = Path(settings.profiling_dir)
+
+# Saves run in worker threads; one prune at a time
+_prune_lock = threading.Lock()
+
+
+def check_profiling_token(token: str | None) -> bool:
+    expected = settings.profiling_token
+    if expected is None or not token:
+        return False
+    return secrets.compare_digest(token.encode(), expected.get_secret_value().encode())
+
+
+def profile_path(name: str) -> Path | None:
+    """Resolve a profile name from a URL, refusing anything outside PROFILES_DIR."""
+    if not name.endswith(PROFILE_SUFFIX) or "/" in name or "\\" in name:
+        return None
+    path = PROFILES_DIR / name
+    return path if path.is_file() else None
+
+
+def list_profiles() -> list[tuple[Path, os.stat_result]]:
+    """Saved profiles with their stat results, newest first."""
+    if not PROFILES_DIR.exists():
+        return []
+    profiles = []
+    for path in PROFILES_DIR.glob(f"*{PROFILE_SUFFIX}"):
+        # A concurrent prune may remove files between glob and stat
+        try:
+            profiles.append((path, path.stat()))
+        except FileNotFoundError:
+            continue
+    return sorted(profiles, key=lambda profile: profile[1].st_mtime, reverse=True)
+
+
+def _save_profile(name: str, data: str) -> None:
+    PROFILES_DIR.mkdir(parents=True, exist_ok=True)
+    (PROFILES_DIR / name).write_text(data, encoding="utf-8")
+    with _prune_lock:
+        for old, _stat in list_profiles()[settings.profiling_max_files:]:
+            old.unlink(missing_ok=True)
+
+
+## Profiling Middleware
+class ProfilingMiddleware:
+    def __init__(self, app: ASGIApp, sample_rate: float = 0.0) -> None:
+        self.app = app
+        self.sample_rate = sample_rate
+        # Imported here so pyinstrument only loads when profiling is switched on
+        try:
+            from pyinstrument import Profiler
+            from pyinstrument.renderers import SpeedscopeRenderer
+        except ImportError:
+            logger.warning(
+                "Profiling is enabled but pyinstrument is not installed "
+                "(uv sync --extra profiling)",
+            )
+            self.profiler_class = None
+        else:
+            self.profiler_class = Profiler
+            self.renderer_class = SpeedscopeRenderer
+
+    def should_profile(self, scope: Scope) -> bool:
+        if self.profiler_class is None:
+            return False
+        if check_profiling_token(Headers(scope=scope).get("x-profile-token")):
+            return True
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not self.should_profile(scope):
+            await self.app(scope, receive, send)
+            return
+
+        slug = re.sub(r"[^A-Za-z0-9]+", "_", scope["path"]).strip("_") or "root"
+        name = f"{time.strftime('%Y%m%dT%H%M%S')}-{scope['method']}-{slug[:60]}-{uuid.uuid4().hex[:8]}{PROFILE_SUFFIX}"
+
+        async def send_with_id(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                MutableHeaders(scope=message)["X-Profile-Id"] = name
+            await send(message)
+
+        # async_mode follows this request's task across awaits, so time spent
+        # waiting on the DB or the threadpool (Pillow) shows up under the caller
+        profiler = self.profiler_class(async_mode="enabled")
+        started = time.perf_counter()
+        with track_request_queries() as queries:
+            profiler.start()
+            try:
+                await self.app(scope, receive, send_with_id)
+            finally:
+                profiler.stop()
+
+        logger.info(
+            "Profiled %s %s in %.1f ms (%d queries, %.1f ms in DB): %s",
+            scope["method"],
+            scope["path"],
+            (time.perf_counter() - started) * 1000,
+            queries.count,
+            queries.total_seconds * 1000,
+            name,
+        )
+        # Rendering the speedscope JSON takes a while for long requests
+        await asyncio.to_thread(self._render_and_save, profiler, name)
+
+    def _render_and_save(self, profiler, name: str) -> None:
+        _save_profile(name, profiler.output(self.renderer_class()))
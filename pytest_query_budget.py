@@ -0,0 +1,72 @@
+"""Pytest plugin that fails tests which run more SQL statements than declared.
+
+It is enabled for this repo's tests in pyproject.toml (``-p
+pytest_query_budget``). Either mark a whole test::
+
+    @pytest.mark.query_budget(3)
+    def test_home(client): ...
+
+or budget a single call with the fixture::
+
+    def test_user_posts(client, query_budget):
+        with query_budget(2):
+            client.get("/users/1/posts")
+
+Only statements run from the test's own context count, which includes
+requests made through TestClient but not tasks the app started earlier.
+"""
+from contextlib import contextmanager
+
+import pytest
+
+from db_instrumentation import install_query_listeners, track_request_queries
+
+
+def pytest_configure(config):
+    config.addinivalue_line(
+        "markers",
+        "query_budget(n): fail the test if it executes more than n SQL statements",
+    )
+
+
+def _install_listeners() -> None:
+    # Imported late: plugins load before conftest.py can configure the database
+    from database import engine
+
+    install_query_listeners(engine)
+
+
+def _check_budget(stats, budget: int, where: str) -> None:
+    if stats.count > budget:
+        shapes = "\n".join(f"  {n}x {sql}" for sql, n in stats.statements.most_common())
+        pytest.fail(
+            f"{where} ran {stats.count} SQL statements, budget is {budget}:\n{shapes}",
+            pytrace=False,
+        )
+
+
+@pytest.hookimpl(wrapper=True)
+def pytest_runtest_call(item):
+    marker = item.get_closest_marker("query_budget")
+    if marker is None:
+        return (yield)
+
+    _install_listeners()
+    # A failing test raises out of the yield, so only passing tests are checked
+    with track_request_queries() as stats:
+        result = yield
+    _check_budget(stats, marker.args[0], item.nodeid)
+    return result
+
+
+@pytest.fixture
+def query_budget():
+    _install_listeners()
+
+    @contextmanager
+    def budget(n: int):
+        with track_request_queries() as stats:
+            yield stats
+        _check_budget(stats, n, "Block")
+
+    return budget
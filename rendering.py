@@ -0,0 +1,74 @@
+"""Markdown rendering for post bodies, done once when a post is written.
+
+Backfill posts saved before content_html existed with::
+
+    python rendering.py --batch-size 500
+"""
+import argparse
+import asyncio
+import html
+
+import markdown
+import nh3
+from sqlalchemy import select
+
+import models
+from database import AsyncSessionLocal
+
+EXCERPT_LENGTH = 200
+
+MARKDOWN_EXTENSIONS = ["fenced_code", "tables", "sane_lists"]
+
+
+def render_markdown(content: str) -> str:
+    """Markdown to HTML, sanitized so raw HTML in posts can't inject scripts."""
+    rendered = markdown.markdown(content, extensions=MARKDOWN_EXTENSIONS)
+    return nh3.clean(rendered, link_rel="nofollow noopener noreferrer")
+
+
+def make_excerpt(content_html: str, length: int = EXCERPT_LENGTH) -> str:
+    # Stripping every tag leaves escaped text; the templates escape it again
+    text = " ".join(html.unescape(nh3.clean(content_html, tags=set())).split())
+    if len(text) <= length:
+        return text
+    return text[:length].rsplit(" ", 1)[0] + "…"
+
+
+def render_post_content(content: str) -> tuple[str, str]:
+    """Return ``(content_html, excerpt)`` for a post body."""
+    content_html = render_markdown(content)
+    return content_html, make_excerpt(content_html)
+
+
+## Backfill
+async def backfill(batch_size: int = 500) -> int:
+    """Render every post that has no content_html yet; returns the count."""
+    rendered = 0
+    last_id = 0
+    async with AsyncSessionLocal() as db:
+        while True:
+            result = await db.execute(
+                select(models.Post)
+                .where(models.Post.content_html.is_(None), models.Post.id > last_id)
+                .order_by(models.Post.id)
+                .limit(batch_size),
+            )
+            posts = result.scalars().all()
+            if not posts:
+                break
+            for post in posts:
+                post.content_html, post.excerpt = render_post_content(post.content)
+            await db.commit()
+            # Keep memory flat across batches
+            db.expunge_all()
+            rendered += len(posts)
+            last_id = posts[-1].id
+    return rendered
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Render Markdown for existing posts.")
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+    count = asyncio.run(backfill(args.batch_size))
+    print(f"Rendered {count} posts")
@@ -5,16 +5,78 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
+from sqlalchemy.orm.attributes import set_committed_value
+from starlette.concurrency import run_in_threadpool
 
 import models
 from database import get_db
+from rendering import render_post_content
 from schemas import PostCreate, PostResponse, PostUpdate
+from write_batching import post_writes
 
 from auth import CurrentUser
 
 router = APIRouter()
 
 
+## Post writes
+async def render_content(content: str) -> dict:
+    """content_html and excerpt for a post body, rendered off the event loop."""
+    content_html, excerpt = await run_in_threadpool(render_post_content, content)
+    return {"content_html": content_html, "excerpt": excerpt}
+
+
+# These only stage changes; post_writes.run() commits them, either on the
+# request's session or together with other requests in one batch. Rendering
+# and loading the author happen in the route, outside the shared transaction.
+async def write_new_post(
+    db: AsyncSession,
+    post: PostCreate,
+    user_id: int,
+    rendered: dict,
+) -> models.Post:
+    new_post = models.Post(
+        title=post.title,
+        content=post.content,
+        user_id=user_id,
+        **rendered,
+    )
+    db.add(new_post)
+    await db.flush()
+    return new_post
+
+
+async def write_post_update(
+    db: AsyncSession,
+    post_id: int,
+    user_id: int,
+    update_data: dict,
+) -> models.Post:
+    post = await db.get(models.Post, post_id)
+    if not post:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Post not found",
+        )
+    
+    if post.user_id != user_id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not authorized to update this post",
+        )
+
+    for field, value in update_data.items():
+        setattr(post, field, value)
+    return post
+
+
+def with_author(post: models.Post, author: models.User) -> models.Post:
+    # The writes only allow the current user, so the author is already at
+    # hand; set it as loaded rather than querying (or lazy loading) for it
+    set_committed_value(post, "author", author)
+    return post
+
+
 @router.get('/api')
 def api():
     return {
@@ -28,6 +90,9 @@ async def get_posts(db: Annotated[AsyncSession, Depends(get_db)]):
     result = await db.execute(
         select(models.Post)
         .options(selectinload(models.Post.author))
+        # Accounts being purged are hidden already
+        .join(models.Post.author)
+        .where(models.User.deleted_at.is_(None))
         .order_by(models.Post.date_posted.desc()),
     )
     posts = result.scalars().all()
@@ -45,15 +110,9 @@ async def create_post(
     current_user: CurrentUser,
     db: Annotated[AsyncSession, Depends(get_db)],
 ):
-    new_post = models.Post(
-        title=post.title,
-        content=post.content,
-        user_id=current_user.id,
-    )
-    db.add(new_post)
-    await db.commit()
-    await db.refresh(new_post, attribute_names=["author"])
-    return new_post
+    rendered = await render_content(post.content)
+    new_post = await post_writes.run(db, write_new_post, post, current_user.id, rendered)
+    return with_author(new_post, current_user)
 
 ## get_post
 @router.get("/{post_id}", response_model=PostResponse) # prefix="/api/posts"
@@ -61,7 +120,8 @@ async def get_post(post_id: int, db: Annotated[AsyncSession, Depends(get_db)]):
     result = await db.execute(
         select(models.Post)
         .options(selectinload(models.Post.author))
-        .where(models.Post.id == post_id),
+        .join(models.Post.author)
+        .where(models.Post.id == post_id, models.User.deleted_at.is_(None)),
     )
     post = result.scalars().first()
     if post:
@@ -78,26 +138,10 @@ async def update_post_full(
     current_user: CurrentUser,
     db: Annotated[AsyncSession, Depends(get_db)],
 ):
-    result = await db.execute(select(models.Post).where(models.Post.id == post_id))
-    post = result.scalars().first()
-    if not post:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Post not found",
-        )
-    
-    if post.user_id != current_user.id:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Not authorized to update this post",
-        )
-
-    post.title = post_data.title
-    post.content = post_data.content
-
-    await db.commit()
-    await db.refresh(post, attribute_names=["author"])
-    return post
+    update_data = post_data.model_dump()
+    update_data.update(await render_content(post_data.content))
+    post = await post_writes.run(db, write_post_update, post_id, current_user.id, update_data)
+    return with_author(post, current_user)
 
 ## update_post_partial
 @router.patch("/{post_id}", response_model=PostResponse) # prefix="/api/posts"
@@ -107,27 +151,11 @@ async def update_post_partial(
     current_user: CurrentUser,
     db: Annotated[AsyncSession, Depends(get_db)],
 ):
-    result = await db.execute(select(models.Post).where(models.Post.id == post_id))
-    post = result.scalars().first()
-    if not post:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Post not found",
-        )
-    
-    if post.user_id != current_user.id:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Not authorized to update this post",
-        )
-
     update_data = post_data.model_dump(exclude_unset=True)
-    for field, value in update_data.items():
-        setattr(post, field, value)
-
-    await db.commit()
-    await db.refresh(post, attribute_names=["author"])
-    return post
+    if "content" in update_data:
+        update_data.update(await render_content(update_data["content"]))
+    post = await post_writes.run(db, write_post_update, post_id, current_user.id, update_data)
+    return with_author(post, current_user)
     
 ## delete_post
 @router.delete("/{post_id}", status_code=status.HTTP_204_NO_CONTENT) # prefix="/api/posts"
@@ -0,0 +1,41 @@
+## Imports for Profiles Router
+from datetime import UTC, datetime
+from typing import Annotated
+
+from fastapi import APIRouter, Depends, Header, HTTPException, status
+from fastapi.responses import FileResponse
+
+from profiling import check_profiling_token, list_profiles, profile_path
+
+router = APIRouter()
+
+
+## require_profiling_token
+def require_profiling_token(x_profile_token: Annotated[str | None, Header()] = None) -> None:
+    if not check_profiling_token(x_profile_token):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not authorized to access profiles",
+        )
+
+
+## get_profiles
+@router.get("", dependencies=[Depends(require_profiling_token)]) # prefix="/api/profiles"
+async def get_profiles():
+    profiles = []
+    for path, stat in list_profiles():
+        profiles.append({
+            "name": path.name,
+            "size_bytes": stat.st_size,
+            "created": datetime.fromtimestamp(stat.st_mtime, UTC),
+        })
+    return profiles
+
+
+## download_profile
+@router.get("/{name}", dependencies=[Depends(require_profiling_token)]) # prefix="/api/profiles"
+async def download_profile(name: str):
+    path = profile_path(name)
+    if path is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Profile not found")
+    return FileResponse(path, media_type="application/json", filename=name)
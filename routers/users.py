@@ -1,28 +1,32 @@
 ## Imports for Users Router
 from typing import Annotated
 
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status, UploadFile
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 
 import models
 from database import get_db
-from datetime import timedelta
+from datetime import UTC, datetime, timedelta
 from fastapi.security import OAuth2PasswordRequestForm
 
 from sqlalchemy import func, select
 from auth import (
+    consume_refresh_token,
     create_access_token,
+    create_refresh_token,
     hash_password,
+    revoke_refresh_tokens,
     verify_password
 )
 
-from PIL import UnidentifiedImageError
+from account_purge import purge_user
 from starlette.concurrency import run_in_threadpool
-from image_utils import delete_profile_image, process_profile_image
+from image_utils import ImageTooLargeError, process_profile_image
+from media_cleanup import cleanup_queue
 
-from schemas import PostResponse,Token, UserCreate, UserPrivate, UserPublic, UserUpdate
+from schemas import PostResponse, RefreshRequest, Token, UserCreate, UserPrivate, UserPublic, UserUpdate
 from config import settings
 
 from auth import CurrentUser
@@ -78,6 +82,7 @@ async def login_for_access_token(
     result = await db.execute(
         select(models.User).where(
             func.lower(models.User.email) == form_data.username.lower(),
+            models.User.deleted_at.is_(None),
         ),
     )
     user = result.scalars().first()
@@ -97,7 +102,34 @@ async def login_for_access_token(
         data={"sub": str(user.id)},
         expires_delta=access_token_expires,
     )
-    return Token(access_token=access_token, token_type="bearer")
+
+    # Refresh tokens let clients renew access tokens without the password
+    await revoke_refresh_tokens(db, user.id, expired_only=True)
+    refresh_token = create_refresh_token(db, user.id)
+    await db.commit()
+    return Token(access_token=access_token, token_type="bearer", refresh_token=refresh_token)
+
+
+## refresh_access_token
+@router.post("/token/refresh", response_model=Token)
+async def refresh_access_token(
+    refresh: RefreshRequest,
+    db: Annotated[AsyncSession, Depends(get_db)],
+):
+    # Rotation: the presented token is deleted and a new one is issued
+    user_id = await consume_refresh_token(db, refresh.refresh_token)
+    if user_id is None:
+        await db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid or expired refresh token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+    access_token = create_access_token(data={"sub": str(user_id)})
+    refresh_token = create_refresh_token(db, user_id)
+    await db.commit()
+    return Token(access_token=access_token, token_type="bearer", refresh_token=refresh_token)
 
 
 ## get_current_user
@@ -108,7 +140,9 @@ async def get_current_user(current_user: CurrentUser):
 ## get_user
 @router.get("/{user_id}", response_model=UserPublic) # prefix="/api/users"
 async def get_user(user_id: int, db: Annotated[AsyncSession, Depends(get_db)]):
-    result = await db.execute(select(models.User).where(models.User.id == user_id))
+    result = await db.execute(
+        select(models.User).where(models.User.id == user_id, models.User.deleted_at.is_(None)),
+    )
     user = result.scalars().first()
     if user:
         return user
@@ -118,7 +152,9 @@ async def get_user(user_id: int, db: Annotated[AsyncSession, Depends(get_db)]):
 ## get_user_posts
 @router.get("/{user_id}/posts", response_model=list[PostResponse]) # prefix="/api/users"
 async def get_user_posts(user_id: int, db: Annotated[AsyncSession, Depends(get_db)]):
-    result = await db.execute(select(models.User).where(models.User.id == user_id))
+    result = await db.execute(
+        select(models.User).where(models.User.id == user_id, models.User.deleted_at.is_(None)),
+    )
     user = result.scalars().first()
     if not user:
         raise HTTPException(
@@ -198,7 +234,8 @@ async def update_user(
 @router.delete("/{user_id}", status_code=status.HTTP_204_NO_CONTENT) # prefix="/api/users"
 async def delete_user(user_id: int,
                       current_user: CurrentUser,
-                       db: Annotated[AsyncSession, Depends(get_db)]):
+                       db: Annotated[AsyncSession, Depends(get_db)],
+                      background_tasks: BackgroundTasks):
     
     if user_id != current_user.id:
         raise HTTPException(
@@ -216,12 +253,29 @@ async def delete_user(user_id: int,
         )
     old_filename = user.image_file
 
+    await revoke_refresh_tokens(db, user.id)
+
+    # Heavy accounts are purged in chunks after the response is sent. The
+    # account is marked deleted first, so it can't be used in the meantime
+    # and an interrupted purge is picked up again on the next startup.
+    post_count = await db.scalar(
+        select(func.count()).select_from(models.Post).where(models.Post.user_id == user_id),
+    )
+    if post_count > settings.account_purge_chunk_size:
+        user.deleted_at = datetime.now(UTC)
+        await db.commit()
+        background_tasks.add_task(
+            purge_user, user_id, old_filename, settings.account_purge_chunk_size,
+        )
+        return
+
+    # Posts go with the user via ON DELETE CASCADE (passive_deletes: nothing is loaded)
     await db.delete(user)
     await db.commit()
 
     # Deleting the profile pic when the use delete their account
     if old_filename:
-        delete_profile_image(old_filename)
+        cleanup_queue.enqueue(old_filename)
 
 ## Upload Profile Picture Endpoint
 @router.patch("/{user_id}/picture", response_model=UserPrivate)
@@ -245,13 +299,22 @@ async def upload_profile_picture(
             detail=f"File too large. Maximum size is {settings.max_upload_size_bytes // (1024 * 1024)}MB",
         )
 
+    from PIL import UnidentifiedImageError
+
     try:
-        new_filename = await run_in_threadpool(process_profile_image, content)
+        new_filename = await run_in_threadpool(
+            process_profile_image, content, settings.max_image_pixels,
+        )
     except UnidentifiedImageError as err:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Invalid image file. Please upload a valid image (JPEG, PNG, GIF, WebP).",
         ) from err
+    except ImageTooLargeError as err:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Image dimensions too large. Maximum is {settings.max_image_pixels // 1_000_000} megapixels",
+        ) from err
 
     old_filename = current_user.image_file
 
@@ -260,7 +323,7 @@ async def upload_profile_picture(
     await db.refresh(current_user)
 
     if old_filename:
-        delete_profile_image(old_filename)
+        cleanup_queue.enqueue(old_filename)
 
     return current_user
 
@@ -289,6 +352,6 @@ async def delete_user_picture(
     await db.commit()
     await db.refresh(current_user)
 
-    delete_profile_image(old_filename)
+    cleanup_queue.enqueue(old_filename)
 
     return current_user
\ No newline at end of file
@@ -32,10 +32,14 @@ class UserUpdate(BaseModel):
 class Token(BaseModel):
     access_token: str
     token_type: str
+    refresh_token: str | None = None
+
+class RefreshRequest(BaseModel):
+    refresh_token: str = Field(min_length=1)
 
 class PostBase(BaseModel):
     title: str=Field(min_length=1, max_length=100)
-    content: str=Field(min_length=1)
+    content: str=Field(min_length=1, max_length=100_000)
     
 
 class PostCreate(PostBase):
@@ -43,12 +47,16 @@ class PostCreate(PostBase):
 
 class PostUpdate(BaseModel):
     title: str | None=Field(default=None, min_length=1, max_length=100)
-    content: str | None=Field(default=None, min_length=1)
+    content: str | None=Field(default=None, min_length=1, max_length=100_000)
 
 class PostResponse(PostBase):
     model_config = ConfigDict(from_attributes=True)
 
+    # The length limit is for input; older posts may be longer
+    content: str
     id: int
     user_id: int
     date_posted: datetime
+    content_html: str | None
+    excerpt: str | None
     author: UserPublic
\ No newline at end of file
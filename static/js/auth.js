@@ -1,5 +1,6 @@
 let currentUser = null;
 let fetchPromise = null;
+let refreshPromise = null;
 
 export async function getCurrentUser() {
   if (currentUser) {
@@ -18,18 +19,14 @@ export async function getCurrentUser() {
 
   fetchPromise = (async () => {
     try {
-      const response = await fetch("/api/users/me", {
-        headers: {
-          Authorization: `Bearer ${token}`,
-        },
-      });
+      const response = await authFetch("/api/users/me");
 
       if (response.ok) {
         currentUser = await response.json();
         return currentUser;
       }
 
-      localStorage.removeItem("access_token");
+      clearTokens();
       return null;
     } catch (error) {
       console.error("Error fetching current user:", error);
@@ -43,7 +40,7 @@ export async function getCurrentUser() {
 }
 
 export function logout() {
-  localStorage.removeItem("access_token");
+  clearTokens();
   currentUser = null;
   window.location.href = "/";
 }
@@ -56,6 +53,74 @@ export function setToken(token) {
   localStorage.setItem("access_token", token);
 }
 
+export function setTokens(data) {
+  localStorage.setItem("access_token", data.access_token);
+  if (data.refresh_token) {
+    localStorage.setItem("refresh_token", data.refresh_token);
+  }
+}
+
+export function clearTokens() {
+  localStorage.removeItem("access_token");
+  localStorage.removeItem("refresh_token");
+}
+
+// Swap the refresh token for a new token pair; resolves to the new access token or null
+export async function refreshAccessToken() {
+  // Share one in-flight refresh: the server rotates (invalidates) the old token
+  if (refreshPromise) {
+    return refreshPromise;
+  }
+
+  const refreshToken = localStorage.getItem("refresh_token");
+  if (!refreshToken) {
+    return null;
+  }
+
+  refreshPromise = (async () => {
+    try {
+      const response = await fetch("/api/users/token/refresh", {
+        method: "POST",
+        headers: { "Content-Type": "application/json" },
+        body: JSON.stringify({ refresh_token: refreshToken }),
+      });
+
+      if (response.ok) {
+        const data = await response.json();
+        setTokens(data);
+        return data.access_token;
+      }
+
+      clearTokens();
+      return null;
+    } catch (error) {
+      console.error("Error refreshing token:", error);
+      return null;
+    } finally {
+      refreshPromise = null;
+    }
+  })();
+
+  return refreshPromise;
+}
+
+// fetch() with the bearer token; on 401 refreshes silently and retries once
+export async function authFetch(url, options = {}) {
+  const send = (token) =>
+    fetch(url, {
+      ...options,
+      headers: { ...options.headers, Authorization: `Bearer ${token}` },
+    });
+
+  const response = await send(getToken());
+  if (response.status !== 401) {
+    return response;
+  }
+
+  const token = await refreshAccessToken();
+  return token ? send(token) : response;
+}
+
 export function clearUserCache() {
   currentUser = null;
 }
\ No newline at end of file
@@ -0,0 +1,42 @@
+import os
+import tempfile
+import uuid
+
+import pytest
+
+# Settings are read when the app is imported, so point it at a scratch
+# database (never the checked-in blog.db) before any test imports main
+_scratch = tempfile.TemporaryDirectory()
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{_scratch.name}/test.db"
+os.environ.setdefault("SECRET_KEY", "test-secret-key")
+
+
+@pytest.fixture
+def client():
+    from fastapi.testclient import TestClient
+
+    from main import app
+
+    with TestClient(app) as client:
+        yield client
+
+
+@pytest.fixture
+def new_user(client):
+    """Register a fresh user and log in; returns the login response JSON plus the id."""
+
+    def create(password: str = "password123") -> dict:
+        name = f"user-{uuid.uuid4().hex[:12]}"
+        email = f"{name}@example.com"
+        response = client.post(
+            "/api/users",
+            json={"username": name, "email": email, "password": password},
+        )
+        assert response.status_code == 201
+        tokens = client.post(
+            "/api/users/token",
+            data={"username": email, "password": password},
+        ).json()
+        return {**tokens, "id": response.json()["id"], "email": email, "password": password}
+
+    return create
@@ -0,0 +1,64 @@
+import pytest
+from sqlalchemy import func, select
+
+import models
+import routers.users
+from account_purge import resume_pending_purges
+from config import settings
+from database import AsyncSessionLocal
+
+
+@pytest.fixture
+def account_being_purged(client, new_user, monkeypatch):
+    """A large account whose deletion was accepted but whose purge hasn't run."""
+    monkeypatch.setattr(settings, "account_purge_chunk_size", 1)
+
+    async def not_yet(*args):
+        pass
+
+    monkeypatch.setattr(routers.users, "purge_user", not_yet)
+    user = new_user()
+    headers = {"Authorization": f"Bearer {user['access_token']}"}
+    post_ids = [
+        client.post(
+            "/api/posts",
+            json={"title": f"Purged post {i}", "content": "Hello"},
+            headers=headers,
+        ).json()["id"]
+        for i in range(2)
+    ]
+    assert client.delete(f"/api/users/{user['id']}", headers=headers).status_code == 204
+    return user["id"], post_ids
+
+
+def test_marked_account_is_hidden(client, account_being_purged):
+    user_id, post_ids = account_being_purged
+
+    assert client.get(f"/api/users/{user_id}").status_code == 404
+    assert client.get(f"/api/users/{user_id}/posts").status_code == 404
+    assert client.get(f"/users/{user_id}/posts").status_code == 404
+    for post_id in post_ids:
+        assert client.get(f"/api/posts/{post_id}").status_code == 404
+        assert client.get(f"/posts/{post_id}").status_code == 404
+    assert not set(post_ids) & {post["id"] for post in client.get("/api/posts").json()}
+    assert "Purged post" not in client.get("/").text
+
+
+def test_interrupted_purge_is_resumed(client, account_being_purged):
+    user_id, post_ids = account_being_purged
+
+    async def remaining_rows():
+        async with AsyncSessionLocal() as db:
+            users = await db.scalar(
+                select(func.count()).select_from(models.User).where(models.User.id == user_id),
+            )
+            posts = await db.scalar(
+                select(func.count()).select_from(models.Post).where(models.Post.id.in_(post_ids)),
+            )
+        return users, posts
+
+    assert client.portal.call(remaining_rows) == (1, 2)
+
+    client.portal.call(resume_pending_purges, 1)
+
+    assert client.portal.call(remaining_rows) == (0, 0)
@@ -0,0 +1,71 @@
+from datetime import UTC, datetime
+
+import pytest
+from sqlalchemy import create_engine, event
+
+import models
+from database import Base, _enable_sqlite_foreign_keys, _rebuild_table, upgrade_schema
+
+
+def make_engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'db.sqlite'}")
+    event.listen(engine, "connect", _enable_sqlite_foreign_keys)
+    return engine
+
+
+def add_user_with_post(conn) -> None:
+    conn.execute(
+        models.User.__table__.insert(),
+        {"id": 1, "username": "ann", "email": "ann@example.com", "password_hash": "x"},
+    )
+    conn.execute(
+        models.Post.__table__.insert(),
+        {"title": "Hi", "content": "Hello", "user_id": 1, "date_posted": datetime.now(UTC)},
+    )
+
+
+def test_refuses_to_rebuild_a_referenced_table(tmp_path):
+    engine = make_engine(tmp_path)
+    with engine.begin() as conn:
+        Base.metadata.create_all(conn)
+        add_user_with_post(conn)
+
+    with pytest.raises(RuntimeError, match="posts, refresh_tokens reference it"):
+        with engine.begin() as conn:
+            _rebuild_table(conn, models.User.__table__)
+
+    with engine.connect() as conn:
+        assert conn.exec_driver_sql("SELECT count(*) FROM posts").scalar() == 1
+        parents = {row[2] for row in conn.exec_driver_sql("PRAGMA foreign_key_list(posts)")}
+        assert parents == {"users"}
+
+
+def test_upgrade_schema_rebuilds_changed_foreign_keys(tmp_path):
+    engine = make_engine(tmp_path)
+    with engine.begin() as conn:
+        Base.metadata.create_all(conn)
+        # posts as an older version made it, without ON DELETE CASCADE
+        conn.exec_driver_sql("DROP TABLE posts")
+        conn.exec_driver_sql(
+            "CREATE TABLE posts (id INTEGER PRIMARY KEY, title VARCHAR(100) NOT NULL, "
+            "content TEXT NOT NULL, user_id INTEGER NOT NULL REFERENCES users (id), "
+            "date_posted DATETIME)",
+        )
+        conn.exec_driver_sql(
+            "INSERT INTO users (id, username, email, password_hash) "
+            "VALUES (1, 'ann', 'ann@example.com', 'x')",
+        )
+        conn.exec_driver_sql(
+            "INSERT INTO posts (title, content, user_id, date_posted) "
+            "VALUES ('Hi', 'Hello', 1, '2024-01-01 00:00:00')",
+        )
+
+    with engine.begin() as conn:
+        upgrade_schema(conn)
+
+    with engine.begin() as conn:
+        rules = {row[6] for row in conn.exec_driver_sql("PRAGMA foreign_key_list(posts)")}
+        assert rules == {"CASCADE"}
+        assert conn.exec_driver_sql("SELECT count(*) FROM posts").scalar() == 1
+        conn.exec_driver_sql("DELETE FROM users WHERE id = 1")
+        assert conn.exec_driver_sql("SELECT count(*) FROM posts").scalar() == 0
@@ -0,0 +1,27 @@
+import asyncio
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from db_instrumentation import install_query_listeners, track_request_queries
+
+
+def test_failed_statement_leaves_no_start_time(tmp_path):
+    async def run():
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'db.sqlite'}")
+        install_query_listeners(engine)
+        async with engine.connect() as conn:
+            with pytest.raises(OperationalError):
+                await conn.execute(text("SELECT * FROM missing"))
+            with track_request_queries() as stats:
+                await conn.execute(text("SELECT 1"))
+            starts = (await conn.get_raw_connection()).info["query_start"]
+        await engine.dispose()
+        return starts, stats
+
+    starts, stats = asyncio.run(run())
+
+    assert starts == []
+    assert stats.count == 1
@@ -0,0 +1,66 @@
+from io import BytesIO
+
+import pytest
+from PIL import Image
+
+import image_utils
+
+
+@pytest.fixture(autouse=True)
+def profile_pics_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(image_utils, "PROFILE_PICS_DIR", tmp_path)
+    return tmp_path
+
+
+def encode(img: Image.Image, fmt: str) -> bytes:
+    buffer = BytesIO()
+    img.save(buffer, fmt)
+    return buffer.getvalue()
+
+
+@pytest.mark.parametrize(
+    ("mode", "fmt"),
+    [
+        ("1", "PNG"),
+        ("P", "PNG"),
+        ("LA", "PNG"),
+        ("RGBA", "PNG"),
+        ("L", "PNG"),
+        ("RGB", "JPEG"),
+        ("CMYK", "JPEG"),
+    ],
+)
+def test_process_profile_image_modes(profile_pics_dir, mode, fmt):
+    content = encode(Image.new(mode, (2000, 1500)), fmt)
+
+    filename = image_utils.process_profile_image(content)
+
+    with Image.open(profile_pics_dir / filename) as saved:
+        assert saved.format == "JPEG"
+        assert saved.size == (300, 300)
+        assert saved.mode in ("RGB", "L")
+
+
+@pytest.fixture
+def pillow_pixel_cap(monkeypatch):
+    # process_profile_image sets the global; let monkeypatch restore it
+    monkeypatch.setattr(Image, "MAX_IMAGE_PIXELS", Image.MAX_IMAGE_PIXELS)
+
+
+@pytest.mark.usefixtures("pillow_pixel_cap")
+@pytest.mark.parametrize("fmt", ["JPEG", "PNG"])
+def test_max_pixels_checks_stored_dimensions(fmt):
+    # 12 MP; a JPEG would decode at 1/8 scale, but the limit is on the real size
+    content = encode(Image.new("RGB", (4000, 3000)), fmt)
+
+    with pytest.raises(image_utils.ImageTooLargeError):
+        image_utils.process_profile_image(content, max_pixels=1_000_000)
+
+    assert image_utils.process_profile_image(content, max_pixels=12_000_000)
+
+
+@pytest.mark.usefixtures("pillow_pixel_cap")
+def test_max_pixels_sets_pillow_cap():
+    image_utils.process_profile_image(encode(Image.new("L", (400, 400)), "PNG"), max_pixels=500_000_000)
+
+    assert Image.MAX_IMAGE_PIXELS == 500_000_000
@@ -0,0 +1,44 @@
+import asyncio
+
+import pytest
+
+import image_utils
+from media_cleanup import MediaCleanupQueue
+
+
+@pytest.fixture(autouse=True)
+def profile_pics_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(image_utils, "PROFILE_PICS_DIR", tmp_path)
+    return tmp_path
+
+
+async def delete_files(queue: MediaCleanupQueue, *filenames: str) -> None:
+    queue.start()
+    for filename in filenames:
+        queue.enqueue(filename)
+    await asyncio.wait_for(queue.stop(), timeout=5)
+
+
+def test_queue_works_across_event_loops(profile_pics_dir):
+    # Each app lifespan (e.g. each TestClient) runs on its own event loop
+    queue = MediaCleanupQueue()
+    for name in ("first.jpg", "second.jpg"):
+        (profile_pics_dir / name).touch()
+        asyncio.run(delete_files(queue, name))
+        assert not (profile_pics_dir / name).exists()
+
+
+def test_bad_filename_does_not_stop_the_worker(profile_pics_dir):
+    (profile_pics_dir / "ok.jpg").touch()
+
+    asyncio.run(delete_files(MediaCleanupQueue(), "bad\0name.jpg", "ok.jpg"))
+
+    assert not (profile_pics_dir / "ok.jpg").exists()
+
+
+def test_enqueue_before_start_is_left_for_the_sweep(profile_pics_dir):
+    (profile_pics_dir / "kept.jpg").touch()
+
+    MediaCleanupQueue().enqueue("kept.jpg")
+
+    assert (profile_pics_dir / "kept.jpg").exists()
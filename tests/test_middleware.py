@@ -0,0 +1,131 @@
+import gzip
+
+import pytest
+from starlette.applications import Starlette
+from starlette.responses import FileResponse, PlainTextResponse, Response, StreamingResponse
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+from middleware import CompressionMiddleware, choose_encoding
+
+TEXT = "lorem ipsum dolor sit amet " * 100
+
+
+async def text(request):
+    return PlainTextResponse(TEXT, headers={"ETag": '"abc"'})
+
+
+async def small(request):
+    return PlainTextResponse("short")
+
+
+async def png(request):
+    return Response(TEXT.encode(), media_type="image/png")
+
+
+async def stream(request):
+    async def chunks():
+        for _ in range(5):
+            yield TEXT
+
+    return StreamingResponse(chunks(), media_type="text/plain")
+
+
+@pytest.fixture
+def client(tmp_path):
+    css = tmp_path / "site.css"
+    css.write_text(TEXT)
+
+    async def file(request):
+        # Sends an empty body for HEAD
+        return FileResponse(css)
+
+    app = Starlette(
+        routes=[
+            Route("/text", text, methods=["GET", "HEAD"]),
+            Route("/file", file, methods=["GET", "HEAD"]),
+            Route("/small", small),
+            Route("/png", png),
+            Route("/stream", stream),
+        ],
+    )
+    app.add_middleware(CompressionMiddleware, minimum_size=500)
+    return TestClient(app)
+
+
+def get(client, path, accept_encoding, method="GET"):
+    return client.request(method, path, headers={"Accept-Encoding": accept_encoding})
+
+
+@pytest.mark.parametrize(
+    ("accept_encoding", "expected"),
+    [
+        ("gzip, br, zstd", "br"),
+        ("gzip, zstd", "zstd"),
+        ("br;q=0, gzip", "gzip"),
+        ("gzip;q=0.5, zstd;q=0.8", "zstd"),
+        ("*", "br"),
+        ("*;q=0.5, br;q=0", "zstd"),
+        ("*;q=0", None),
+        ("identity", None),
+        ("", None),
+        ("gzip;q=bogus", None),
+    ],
+)
+def test_choose_encoding(accept_encoding, expected):
+    assert choose_encoding(accept_encoding, ["br", "zstd", "gzip"]) == expected
+
+
+@pytest.mark.parametrize("encoding", ["br", "zstd", "gzip"])
+def test_compresses_text(client, encoding):
+    response = get(client, "/text", encoding)
+
+    assert response.headers["content-encoding"] == encoding
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert response.headers["etag"] == 'W/"abc"'
+    assert int(response.headers["content-length"]) < len(TEXT)
+    assert response.text == TEXT
+
+
+def test_identity_still_varies(client):
+    response = get(client, "/text", "identity")
+
+    assert "content-encoding" not in response.headers
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert response.headers["etag"] == '"abc"'
+    assert response.text == TEXT
+
+
+def test_below_minimum_size(client):
+    response = get(client, "/small", "gzip")
+
+    assert "content-encoding" not in response.headers
+    assert response.text == "short"
+
+
+def test_skips_other_content_types(client):
+    response = get(client, "/png", "gzip")
+
+    assert "content-encoding" not in response.headers
+    assert "vary" not in response.headers
+    assert response.content == TEXT.encode()
+
+
+def test_streaming(client):
+    with client.stream("GET", "/stream", headers={"Accept-Encoding": "gzip"}) as response:
+        raw = b"".join(response.iter_raw())
+
+    assert response.headers["content-encoding"] == "gzip"
+    assert "content-length" not in response.headers
+    assert gzip.decompress(raw).decode() == TEXT * 5
+
+
+@pytest.mark.parametrize("path", ["/text", "/file"])
+@pytest.mark.parametrize("accept_encoding", ["gzip", "identity"])
+def test_head_headers_match_get(client, path, accept_encoding):
+    head = get(client, path, accept_encoding, method="HEAD")
+    full = get(client, path, accept_encoding)
+
+    for name in ("content-encoding", "vary", "etag"):
+        assert head.headers.get(name) == full.headers.get(name)
+    assert head.content == b""
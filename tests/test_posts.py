@@ -0,0 +1,44 @@
+def bearer(access_token: str) -> dict:
+    return {"Authorization": f"Bearer {access_token}"}
+
+
+def test_content_is_rendered_on_write(client, new_user):
+    headers = bearer(new_user()["access_token"])
+
+    created = client.post(
+        "/api/posts",
+        json={"title": "Hello", "content": "Some *emphasis* <script>x</script>"},
+        headers=headers,
+    ).json()
+
+    assert created["content_html"] == "<p>Some <em>emphasis</em> </p>"
+    assert created["excerpt"] == "Some emphasis"
+
+    updated = client.patch(
+        f"/api/posts/{created['id']}",
+        json={"content": "Now **bold**"},
+        headers=headers,
+    ).json()
+
+    assert updated["content_html"] == "<p>Now <strong>bold</strong></p>"
+    assert updated["excerpt"] == "Now bold"
+
+    retitled = client.patch(
+        f"/api/posts/{created['id']}",
+        json={"title": "Renamed"},
+        headers=headers,
+    ).json()
+
+    assert retitled["content_html"] == updated["content_html"]
+
+
+def test_content_length_is_limited(client, new_user):
+    headers = bearer(new_user()["access_token"])
+    too_long = "x" * 100_001
+
+    response = client.post("/api/posts", json={"title": "Long", "content": too_long}, headers=headers)
+    assert response.status_code == 422
+
+    post_id = client.post("/api/posts", json={"title": "Short", "content": "x"}, headers=headers).json()["id"]
+    response = client.patch(f"/api/posts/{post_id}", json={"content": too_long}, headers=headers)
+    assert response.status_code == 422
@@ -0,0 +1,47 @@
+import pytest
+from pydantic import SecretStr
+from starlette.applications import Starlette
+from starlette.responses import PlainTextResponse
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+import profiling
+from config import settings
+
+pytest.importorskip("pyinstrument")
+
+
+async def hello(request):
+    return PlainTextResponse("hello")
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.setattr(profiling, "PROFILES_DIR", tmp_path)
+    monkeypatch.setattr(settings, "profiling_token", SecretStr("secret"))
+    app = Starlette(routes=[Route("/", hello)])
+    app.add_middleware(profiling.ProfilingMiddleware)
+    return TestClient(app)
+
+
+def test_profiles_requests_with_the_token_header(client, tmp_path):
+    response = client.get("/", headers={"X-Profile-Token": "secret"})
+
+    name = response.headers["x-profile-id"]
+    assert (tmp_path / name).is_file()
+    assert [path for path, _stat in profiling.list_profiles()] == [tmp_path / name]
+
+
+@pytest.mark.parametrize(
+    ("path", "headers"),
+    [
+        ("/", {"X-Profile-Token": "wrong"}),
+        ("/?x_profile_token=secret", {}),
+        ("/", {}),
+    ],
+)
+def test_other_requests_are_not_profiled(client, tmp_path, path, headers):
+    response = client.get(path, headers=headers)
+
+    assert "x-profile-id" not in response.headers
+    assert profiling.list_profiles() == []
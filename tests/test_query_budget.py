@@ -0,0 +1,24 @@
+import pytest
+
+
+def test_home_page_budget(client, new_user, query_budget):
+    user = new_user()
+    headers = {"Authorization": f"Bearer {user['access_token']}"}
+    for i in range(3):
+        client.post("/api/posts", json={"title": f"Post {i}", "content": "Hello"}, headers=headers)
+
+    # Posts and their authors, however many posts there are
+    with query_budget(2):
+        assert client.get("/").status_code == 200
+
+
+def test_over_budget_fails(client, query_budget):
+    with pytest.raises(pytest.fail.Exception, match="budget is 1"):
+        with query_budget(1):
+            client.get("/api/posts")
+            client.get("/api/posts")
+
+
+@pytest.mark.query_budget(2)
+def test_marker_budget(client):
+    client.get("/api/posts")
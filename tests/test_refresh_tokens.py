@@ -0,0 +1,79 @@
+from config import settings
+
+
+def bearer(access_token: str) -> dict:
+    return {"Authorization": f"Bearer {access_token}"}
+
+
+def refresh(client, refresh_token: str):
+    return client.post("/api/users/token/refresh", json={"refresh_token": refresh_token})
+
+
+def test_refresh_rotates_tokens(client, new_user):
+    user = new_user()
+
+    response = refresh(client, user["refresh_token"])
+
+    assert response.status_code == 200
+    rotated = response.json()
+    assert rotated["refresh_token"] != user["refresh_token"]
+    me = client.get("/api/users/me", headers=bearer(rotated["access_token"]))
+    assert me.status_code == 200
+    assert me.json()["id"] == user["id"]
+    # The new refresh token works in turn
+    assert refresh(client, rotated["refresh_token"]).status_code == 200
+
+
+def test_consumed_refresh_token_is_rejected(client, new_user):
+    user = new_user()
+    assert refresh(client, user["refresh_token"]).status_code == 200
+
+    response = refresh(client, user["refresh_token"])
+
+    assert response.status_code == 401
+    assert response.headers["www-authenticate"] == "Bearer"
+
+
+def test_unknown_refresh_token_is_rejected(client):
+    assert refresh(client, "not-a-token").status_code == 401
+
+
+def test_expired_refresh_token_is_rejected(client, new_user, monkeypatch):
+    monkeypatch.setattr(settings, "refresh_token_expire_days", -1)
+    user = new_user()
+
+    assert refresh(client, user["refresh_token"]).status_code == 401
+
+
+def test_delete_user_revokes_refresh_tokens(client, new_user):
+    user = new_user()
+    other_session = client.post(
+        "/api/users/token",
+        data={"username": user["email"], "password": user["password"]},
+    ).json()
+
+    response = client.delete(f"/api/users/{user['id']}", headers=bearer(user["access_token"]))
+
+    assert response.status_code == 204
+    assert refresh(client, user["refresh_token"]).status_code == 401
+    assert refresh(client, other_session["refresh_token"]).status_code == 401
+
+
+def test_deleting_large_account_locks_it_out_at_once(client, new_user, monkeypatch):
+    # Above the chunk size the purge runs after the response
+    monkeypatch.setattr(settings, "account_purge_chunk_size", 1)
+    user = new_user()
+    headers = bearer(user["access_token"])
+    for i in range(3):
+        client.post("/api/posts", json={"title": f"Post {i}", "content": "Hello"}, headers=headers)
+
+    response = client.delete(f"/api/users/{user['id']}", headers=headers)
+
+    assert response.status_code == 204
+    assert refresh(client, user["refresh_token"]).status_code == 401
+    assert client.get("/api/users/me", headers=headers).status_code == 401
+    login = client.post(
+        "/api/users/token",
+        data={"username": user["email"], "password": user["password"]},
+    )
+    assert login.status_code == 401
@@ -0,0 +1,193 @@
+import asyncio
+import uuid
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+import models
+from database import Base
+from write_batching import WriteBatcher
+
+
+@pytest.fixture
+def sessions(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'db.sqlite'}")
+
+    async def setup():
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        async with async_sessionmaker(engine)() as db:
+            db.add(models.User(id=1, username="ann", email="ann@example.com", password_hash="x"))
+            db.add(models.User(id=2, username="bob", email="bob@example.com", password_hash="x"))
+            await db.commit()
+
+    asyncio.run(setup())
+    yield async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    asyncio.run(engine.dispose())
+
+
+def add_post(title: str):
+    async def write(db: AsyncSession) -> models.Post:
+        post = models.Post(title=title, content="Hello", user_id=1)
+        db.add(post)
+        return post
+
+    return write
+
+
+async def titles(sessions) -> list[str]:
+    async with sessions() as db:
+        return list(await db.scalars(select(models.Post.title).order_by(models.Post.id)))
+
+
+def test_batcher_works_across_event_loops(sessions):
+    # Each app lifespan (e.g. each TestClient) runs on its own event loop
+    batcher = WriteBatcher(window_ms=1, session_factory=sessions)
+
+    async def lifespan(title: str) -> models.Post:
+        batcher.start()
+        try:
+            return await asyncio.wait_for(batcher.submit(add_post(title)), timeout=5)
+        finally:
+            await batcher.stop()
+
+    assert asyncio.run(lifespan("first")).id is not None
+    assert asyncio.run(lifespan("second")).id is not None
+    assert asyncio.run(titles(sessions)) == ["first", "second"]
+
+
+def test_submit_fails_fast_when_not_running(sessions):
+    batcher = WriteBatcher(session_factory=sessions)
+
+    with pytest.raises(RuntimeError, match="not running"):
+        asyncio.run(batcher.submit(add_post("lost")))
+
+
+def test_batched_posts_across_app_restarts(monkeypatch):
+    from fastapi.testclient import TestClient
+
+    from config import settings
+    from main import app
+
+    monkeypatch.setattr(settings, "write_batching_enabled", True)
+    email = f"batch-{uuid.uuid4().hex[:12]}@example.com"
+    for attempt in range(2):
+        with TestClient(app) as client:
+            if attempt == 0:
+                client.post(
+                    "/api/users",
+                    json={"username": email.split("@")[0], "email": email, "password": "password123"},
+                )
+            token = client.post(
+                "/api/users/token",
+                data={"username": email, "password": "password123"},
+            ).json()["access_token"]
+
+            response = client.post(
+                "/api/posts",
+                json={"title": f"Post {attempt}", "content": "Hello"},
+                headers={"Authorization": f"Bearer {token}"},
+            )
+
+            assert response.status_code == 201
+            assert response.json()["author"]["username"] == email.split("@")[0]
+
+
+class CountingSessions:
+    """Session factory that counts transactions, i.e. batches and retries."""
+
+    def __init__(self, sessions) -> None:
+        self.sessions = sessions
+        self.opened = 0
+
+    def __call__(self) -> AsyncSession:
+        self.opened += 1
+        return self.sessions()
+
+
+async def add_post_by_hand(sessions, title: str, user_id: int = 1) -> int:
+    async with sessions() as db:
+        post = models.Post(title=title, content="Hello", user_id=user_id)
+        db.add(post)
+        await db.commit()
+        return post.id
+
+
+def run_batch(batcher: WriteBatcher, writes) -> list:
+    async def run():
+        batcher.start()
+        try:
+            return await asyncio.gather(
+                *(batcher.submit(write) for write in writes),
+                return_exceptions=True,
+            )
+        finally:
+            await batcher.stop()
+
+    return asyncio.run(run())
+
+
+def test_one_batch_mixes_success_and_errors(sessions):
+    from routers.posts import write_new_post, write_post_update
+    from schemas import PostCreate
+
+    post_id = asyncio.run(add_post_by_hand(sessions, "original"))
+    counting = CountingSessions(sessions)
+    batcher = WriteBatcher(window_ms=20, max_batch=10, session_factory=counting)
+    rendered = {"content_html": "<p>Hello</p>", "excerpt": "Hello"}
+
+    updated, forbidden, missing, created = run_batch(
+        batcher,
+        [
+            lambda db: write_post_update(db, post_id, 1, {"title": "updated"}),
+            lambda db: write_post_update(db, post_id, 2, {"title": "hijacked"}),
+            lambda db: write_post_update(db, 999_999, 1, {"title": "nowhere"}),
+            lambda db: write_new_post(db, PostCreate(title="new", content="Hello"), 1, rendered),
+        ],
+    )
+
+    assert counting.opened == 1
+    assert updated.title == "updated"
+    assert forbidden.status_code == 403
+    assert missing.status_code == 404
+    assert created.id is not None
+    assert asyncio.run(titles(sessions)) == ["updated", "new"]
+
+
+def test_flush_error_falls_back_to_one_commit_per_write(sessions):
+    async def duplicate_user(db: AsyncSession) -> models.User:
+        user = models.User(username="ann", email="ann@example.com", password_hash="x")
+        db.add(user)
+        return user
+
+    counting = CountingSessions(sessions)
+    batcher = WriteBatcher(window_ms=20, max_batch=10, session_factory=counting)
+
+    first, duplicate, last = run_batch(batcher, [add_post("first"), duplicate_user, add_post("last")])
+
+    # The shared batch, then each write again on its own
+    assert counting.opened == 4
+    assert isinstance(duplicate, IntegrityError)
+    assert first.id is not None and last.id is not None
+    assert asyncio.run(titles(sessions)) == ["first", "last"]
+
+
+def test_run_commits_on_the_request_session_when_disabled(sessions):
+    counting = CountingSessions(sessions)
+    batcher = WriteBatcher(session_factory=counting)
+
+    async def write(db: AsyncSession, title: str) -> models.Post:
+        return await add_post(title)(db)
+
+    async def request():
+        async with sessions() as db:
+            return await batcher.run(db, write, "direct")
+
+    post = asyncio.run(request())
+
+    assert not batcher.running
+    assert counting.opened == 0
+    assert post.id is not None
+    assert asyncio.run(titles(sessions)) == ["direct"]
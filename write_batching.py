@@ -0,0 +1,165 @@
+import asyncio
+import logging
+from collections.abc import Awaitable, Callable
+from typing import Any, TypeVar
+
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from config import settings
+from database import AsyncSessionLocal
+
+logger = logging.getLogger("uvicorn.error")
+
+T = TypeVar("T")
+
+# A write stages changes on the session it is given and returns the row.
+# It must raise (e.g. HTTPException) before changing anything, so a
+# rejected request leaves nothing behind in a shared batch.
+Write = Callable[[AsyncSession], Awaitable[T]]
+
+
+## Group commit
+class WriteBatcher:
+    """Coalesce concurrent writes into one transaction (one fsync on SQLite).
+
+    Writes arriving within ``window_ms`` of each other, up to ``max_batch``,
+    share a session and a single COMMIT. Each caller gets its own row or its
+    own exception; if the shared COMMIT fails, the batch is retried one
+    write per transaction so a bad row only fails its own request.
+    """
+
+    def __init__(
+        self,
+        window_ms: float = 5,
+        max_batch: int = 50,
+        session_factory: async_sessionmaker[AsyncSession] = AsyncSessionLocal,
+    ) -> None:
+        self.window = window_ms / 1000
+        self.max_batch = max_batch
+        self.session_factory = session_factory
+        # Made in start(): a queue belongs to the event loop that first uses it,
+        # and each app lifespan (e.g. each TestClient) may run on a new loop
+        self._queue: asyncio.Queue[tuple[Write, asyncio.Future]] | None = None
+        self._worker: asyncio.Task | None = None
+
+    @property
+    def running(self) -> bool:
+        return self._worker is not None
+
+    def start(self) -> None:
+        if self._worker is None:
+            self._queue = asyncio.Queue()
+            self._worker = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._worker is None:
+            return
+        await self._queue.join()
+        self._worker.cancel()
+        self._worker = None
+        self._queue = None
+
+    async def submit(self, write: Write[T]) -> T:
+        if not self.running:
+            raise RuntimeError("WriteBatcher is not running; call start() first")
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((write, future))
+        return await future
+
+    async def run(self, db: AsyncSession, write: Callable[..., Awaitable[T]], *args: Any) -> T:
+        """Batch ``write(session, *args)`` when running, else commit it on ``db``."""
+        if self.running:
+            # Hand the request's connection back to the pool while we wait,
+            # or a burst of waiting requests can starve the batch of one
+            await db.commit()
+            return await self.submit(_bind(write, args))
+        result = await write(db, *args)
+        await db.commit()
+        return result
+
+    async def _run(self) -> None:
+        while True:
+            batch = [await self._queue.get()]
+            # Let concurrent requests join this transaction
+            await asyncio.sleep(self.window)
+            while len(batch) < self.max_batch and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            try:
+                await self._commit_batch(batch)
+            except Exception as err:
+                logger.exception("Batched write failed")
+                _fail(batch, err)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    async def _commit_batch(self, batch: list[tuple[Write, asyncio.Future]]) -> None:
+        outcomes = []
+        async with self.session_factory() as db:
+            for write, _future in batch:
+                try:
+                    row = await write(db)
+                    # Flush so errors belong to this write, and detach the row
+                    # so a later write to it in this batch can't alter our response
+                    await db.flush()
+                    db.expunge(row)
+                    outcomes.append((row, None))
+                except Exception as err:
+                    outcomes.append((None, err))
+                    if isinstance(err, SQLAlchemyError):
+                        break
+            else:
+                try:
+                    await db.commit()
+                except SQLAlchemyError:
+                    pass
+                else:
+                    for (_write, future), (result, err) in zip(batch, outcomes):
+                        _resolve(future, result, err)
+                    return
+            await db.rollback()
+
+        # The shared transaction is unusable: retry every write on its own
+        for write, future in batch:
+            await self._commit_one(write, future)
+
+    async def _commit_one(self, write: Write, future: asyncio.Future) -> None:
+        async with self.session_factory() as db:
+            try:
+                result = await write(db)
+                await db.commit()
+            except Exception as err:
+                await db.rollback()
+                _resolve(future, None, err)
+            else:
+                _resolve(future, result, None)
+
+
+def _bind(write: Callable[..., Awaitable[T]], args: tuple) -> Write[T]:
+    async def bound(db: AsyncSession) -> T:
+        return await write(db, *args)
+
+    return bound
+
+
+def _resolve(future: asyncio.Future, result: Any, err: BaseException | None) -> None:
+    # The request may have been cancelled (client went away) meanwhile
+    if future.done():
+        return
+    if err is not None:
+        future.set_exception(err)
+    else:
+        future.set_result(result)
+
+
+def _fail(batch: list[tuple[Write, asyncio.Future]], err: BaseException) -> None:
+    for _write, future in batch:
+        _resolve(future, None, err)
+
+
+# Shared by the post routes; only started when write_batching_enabled is set
+post_writes = WriteBatcher(
+    window_ms=settings.write_batch_window_ms,
+    max_batch=settings.write_batch_max_size,
+)